@@ -1,40 +1,221 @@
-from dataclasses import dataclass, asdict
-from typing import List, Dict, Callable
+from copy import deepcopy
+from dataclasses import dataclass, asdict, fields, is_dataclass, Field
+from typing import Any, ClassVar, List, Dict, Callable, Tuple, get_type_hints
+
+
+# code for converting a field value by the kind of the field type, `{}` stands for the value
+_TO_DICT_TEMPLATES = {
+    "value": "{}", "values": "list({})", "object": "{}.to_dict()",
+    "objects": "[item.to_dict() for item in {}]", "other": "_value_to_dict({})",
+}
+_COPY_TEMPLATES = {
+    "value": "{}", "values": "list({})", "object": "{}.copy_replace()",
+    "objects": "[item.copy_replace() for item in {}]", "other": "deepcopy({})",
+}
+_FROM_DICT_TEMPLATES = {
+    "value": "{}", "values": "{}", "object": "_type_{name}.from_dict({})",
+    "objects": "[_type_{name}.from_dict(item) for item in {}]", "other": "{}",
+}
+
+
+def _value_to_dict(value: Any) -> Any:
+    """
+    Converts a field value of a type not known in advance the same way as `dataclasses.asdict`.
+    """
+    if is_dataclass(value) and not isinstance(value, type):
+        return asdict(value)
+    elif isinstance(value, tuple) and hasattr(value, "_fields"):  # namedtuple
+        return type(value)(*[_value_to_dict(item) for item in value])
+    elif isinstance(value, (list, tuple)):
+        return type(value)(_value_to_dict(item) for item in value)
+    elif isinstance(value, dict):
+        return type(value)((_value_to_dict(k), _value_to_dict(v)) for k, v in value.items())
+    else:
+        return deepcopy(value)
+
+
+def _field_kinds(cls) -> List[Tuple[Field, str, Any]]:
+    """
+    Returns:
+        List[Tuple[Field, str, Any]]: Fields of `cls` with the kind of their type (scalar `value`, list of scalar
+            `values`, semantic domain `object`, list of semantic domain `objects`, or `other`) and the semantic
+            domain object type for the last two.
+    """
+    try:
+        type_hints = get_type_hints(cls)
+    except Exception:  # unresolvable annotations
+        type_hints = {}
+
+    def is_object_type(type_: Any) -> bool:
+        return isinstance(type_, type) and issubclass(type_, SemanticDomainObject)
+
+    kinds = []
+    for field in fields(cls):
+        type_ = type_hints.get(field.name)
+        is_list = getattr(type_, "__origin__", None) is list and len(type_.__args__) == 1
+        item_type = type_.__args__[0] if is_list else None
+        if type_ in (str, int, float, bool):
+            kinds.append((field, "value", None))
+        elif item_type in (str, int, float, bool):
+            kinds.append((field, "values", None))
+        elif is_object_type(type_):
+            kinds.append((field, "object", type_))
+        elif is_object_type(item_type):
+            kinds.append((field, "objects", item_type))
+        else:
+            kinds.append((field, "other", None))
+    return kinds
+
+
+def _compile(cls, source: str, globals_: Dict[str, Any]) -> Callable:
+    namespace: Dict[str, Any] = {}
+    globals_ = {"deepcopy": deepcopy, "_value_to_dict": _value_to_dict, **globals_}
+    exec(compile(source, f"<generated {cls.__qualname__}>", "exec"), globals_, namespace)
+    return namespace.popitem()[1]
+
+
+def _build_to_dict(cls) -> Callable:
+    """
+    Generates `to_dict` for `cls` that builds the dictionary with a single dict literal, avoiding recursive field
+    introspection done by `dataclasses.asdict`.
+    """
+    entries = []
+    for field, kind, _ in _field_kinds(cls):
+        value = _TO_DICT_TEMPLATES[kind].format(f"self.{field.name}")
+        if field.name in cls._lazy_fields:
+            value = f"({value} if self._raw_{field.name} is None else deepcopy(self._raw_{field.name}))"
+        entries.append(f"{field.name!r}: {value}")
+
+    source = (
+        "def to_dict(self, excluded_fields=None):\n"
+        f"    dict_ = {{{', '.join(entries)}}}\n"
+        "    for field_name in excluded_fields or ():\n"
+        "        dict_.pop(field_name, None)\n"
+        "    return dict_\n"
+    )
+    return _compile(cls, source, {})
+
+
+def _build_copy_replace(cls) -> Callable:
+    """
+    Generates `copy_replace` for `cls` that passes copies of the field values to the constructor. Nested semantic
+    domain objects are copied as objects rather than converted into dictionaries.
+    """
+    entries = [
+        f"{field.name!r}: {_COPY_TEMPLATES[kind].format(f'self.{field.name}')}"
+        for field, kind, _ in _field_kinds(cls) if field.init
+    ]
+    source = (
+        "def copy_replace(self, **kwargs):\n"
+        f"    values = {{{', '.join(entries)}}}\n"
+        "    values.update(kwargs)\n"
+        "    return self.__class__(**values)\n"
+    )
+    return _compile(cls, source, {})
+
+
+def _build_from_dict(cls) -> Callable:
+    """
+    Generates `from_dict` for `cls` that creates the instance with a single constructor call. Fields listed in
+    `get_field_parsing_exceptions` are transformed with the provided callables, nested semantic domain objects are
+    created from their dictionaries (on first access for fields listed in `_lazy_fields`). If the dictionary keys
+    do not match the constructor arguments, the conversions are applied to the present keys only and the
+    constructor reports the error.
+    """
+    transforms = cls.get_field_parsing_exceptions()
+    globals_: Dict[str, Any] = {"_transforms": transforms}
+
+    arguments, lazy_fields, conversions = [], [], []
+    for field, kind, type_ in _field_kinds(cls):
+        if not field.init:
+            continue
+        if field.name in transforms:
+            conversion = f"_transforms[{field.name!r}]({{}})"
+        else:
+            conversion = _FROM_DICT_TEMPLATES[kind].replace("{name}", field.name)
+            globals_[f"_type_{field.name}"] = type_
+
+        if field.name in cls._lazy_fields:
+            lazy_fields.append(field.name)
+            arguments.append(f"{field.name}=None")
+        else:
+            arguments.append(f"{field.name}={conversion.format(f'kwargs[{field.name!r}]')}")
+        if conversion != "{}":
+            conversions.append((field.name, conversion))
+
+    lines = [
+        "def from_dict(cls, kwargs):",
+        f"    if len(kwargs) == {len(arguments)}:",
+        "        try:",
+        *(f"            raw_{name} = kwargs[{name!r}]" for name in lazy_fields),
+        f"            instance = cls({', '.join(arguments)})",
+        "        except KeyError:",
+        "            pass",
+        "        else:",
+        *(f"            del instance.{name}\n            instance._raw_{name} = raw_{name}" for name in lazy_fields),
+        "            return instance",
+        "    values = dict(kwargs)",
+        *(
+            f"    if {name!r} in values:\n        values[{name!r}] = {conversion.format(f'values[{name!r}]')}"
+            for name, conversion in conversions
+        ),
+        "    return cls(**values)",
+    ]
+    return _compile(cls, "\n".join(lines) + "\n", globals_)
+
+
+# `from_dict`, `to_dict` and `copy_replace` start as these stubs, on first use they generate the method for the
+# class and install it in place of the stub, so that later calls go directly to the generated code
+def _from_dict_stub(cls, kwargs):
+    from_dict = _build_from_dict(cls)
+    if getattr(cls.__dict__.get("from_dict"), "__func__", None) is _from_dict_stub:
+        cls.from_dict = classmethod(from_dict)
+    return from_dict(cls, kwargs)
+
+
+def _to_dict_stub(self, excluded_fields=None):
+    cls = type(self)
+    to_dict = _build_to_dict(cls)
+    if cls.__dict__.get("to_dict") is _to_dict_stub:
+        cls.to_dict = to_dict
+    return to_dict(self, excluded_fields)
+
+
+def _copy_replace_stub(self, **kwargs):
+    cls = type(self)
+    copy_replace = _build_copy_replace(cls)
+    if cls.__dict__.get("copy_replace") is _copy_replace_stub:
+        cls.copy_replace = copy_replace
+    return copy_replace(self, **kwargs)
 
 
 @dataclass
 class SemanticDomainObject:
+    __slots__ = ()
+    # fields with lists of objects that `from_dict` stores as raw dictionaries in `_raw_<field>`
+    _lazy_fields: ClassVar[Tuple[str, ...]] = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # every class gets its own stubs, the dataclass fields do not exist yet when this hook is called
+        stubs = {"from_dict": classmethod(_from_dict_stub), "to_dict": _to_dict_stub, "copy_replace": _copy_replace_stub}
+        for name, stub in stubs.items():
+            if name not in cls.__dict__:
+                setattr(cls, name, stub)
+
     @classmethod
     def get_field_parsing_exceptions(cls) -> Dict[str, Callable]:
         return {}
 
-    @classmethod
-    def from_dict(cls, kwargs):
-        for field, transform in cls.get_field_parsing_exceptions().items():
-            if field in kwargs:
-                kwargs[field] = transform(kwargs[field])
-        return cls(**kwargs)
-    
-    def to_dict(self, excluded_fields=None):
-        dict_ = asdict(self)
-
-        if excluded_fields is None:
-            excluded_fields = []
-
-        for field_name in list(dict_.keys()):
-            if field_name in excluded_fields:
-                dict_.pop(field_name)
-        
-        return dict_
-    
-    def copy_replace(self, **kwargs):
-        values = asdict(self)
-        values.update(kwargs)
-        return self.__class__(**values)
-    
+    from_dict = classmethod(_from_dict_stub)
+    to_dict = _to_dict_stub
+    copy_replace = _copy_replace_stub
+
 
 @dataclass
 class Question(SemanticDomainObject):
+    __slots__ = ("num", "text", "words")
+
     num: int
     text: str
     words: List[str]
@@ -42,13 +223,20 @@ class Question(SemanticDomainObject):
 
 @dataclass
 class Domain(SemanticDomainObject):
+    __slots__ = ("code", "title", "description", "questions", "_raw_questions")
+    _lazy_fields = ("questions",)
+
     code: str
     title: str
     description: str
     questions: List[Question]
 
-    @classmethod
-    def get_field_parsing_exceptions(cls) -> Dict[str, Callable]:
-        return {
-            "questions": lambda questions: [Question.from_dict(q) for q in questions]
-        }
+    def __getattr__(self, name: str) -> Any:
+        # only called for unset attributes, `questions` is unset for a domain loaded with `from_dict` until first access
+        if name == "questions":
+            self.questions = [Question.from_dict(question) for question in self._raw_questions]
+            self._raw_questions = None
+            return self.questions
+        elif name == "_raw_questions":
+            return None  # questions were not loaded lazily
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
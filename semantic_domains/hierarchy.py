@@ -1,64 +1,134 @@
-from copy import copy
+from functools import lru_cache
 import json
 from pathlib import Path
-from typing import Dict, Generator, List, Optional, Type, Union
+from typing import Dict, Generator, Iterator, List, NamedTuple, Optional, Tuple, Type, Union
 
 from semantic_domains.definitions import Domain, Question
 from semantic_domains.rwc_parser import DomainType
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+@lru_cache(maxsize=4096)
+def _parse_code(code: str) -> Tuple[int, ...]:
+    return tuple(int(part) for part in code.split("."))
+
+
+class _FlatViews(NamedTuple):
+    """
+    Subtree of a `DomainNode` flattened in traversal order.
+    """
+    nodes: List["DomainNode"]
+    depths: List[int]
+    max_depth: int
+    domains: List[Domain]
+    nodes_by_code: Dict[Tuple[int, ...], "DomainNode"]
+
 
 class DomainNode:
+    __slots__ = ("subdomains", "content", "parent", "_flat_views")
+
     subdomains: Dict[int, 'DomainNode']
     content: Optional[Domain]
     parent: Optional["DomainNode"]
+    _flat_views: Optional[_FlatViews]  # populated by `finalize`
 
     def __init__(self, parent: Optional["DomainNode"] = None):
         self.subdomains = {}
         self.content = None
         self.parent = parent
+        self._flat_views = None
 
     def domain_code(self, code: str) -> List[int]:
-        return [int(part) for part in code.split(".")]
+        return list(_parse_code(code))
 
     def insert(self, domain: Domain, code_parts: Optional[List[int]] = None) -> None:
         if code_parts is None:
-            code_parts = self.domain_code(domain.code)
-        
-        if len(code_parts) == 0:
-            assert self.content is None
-            self.content = domain
-        else:
-            current_code, remaining = code_parts[0], code_parts[1:]
-            if current_code not in self.subdomains:
-                self.subdomains[current_code] = DomainNode(parent=self)
-            self.subdomains[current_code].insert(domain, remaining)
+            code_parts = _parse_code(domain.code)  # type: ignore[assignment]
+
+        node = self
+        for part in code_parts:
+            next_node = node.subdomains.get(part)
+            if next_node is None:
+                next_node = DomainNode(parent=node)
+                node.subdomains[part] = next_node
+            node = next_node
+
+        assert node.content is None
+        node.content = domain
+
+        # flat views of every node on the path to the root now miss the new domain
+        parent_ref: Optional[DomainNode] = node
+        while parent_ref is not None:
+            parent_ref._flat_views = None
+            parent_ref = parent_ref.parent
+
+    def finalize(self) -> None:
+        """
+        Flattens the subtree into arrays of nodes and domains in traversal order, and an index of nodes by code.
+        Iteration and lookup use these instead of walking the tree. Inserting into the subtree resets the flat views
+        of this node, call `finalize` again after the subtree is modified.
+        """
+        nodes, depths, domains = [], [], []
+        nodes_by_code = {(): self}
+
+        stack = [((code,), 1, node) for code, node in reversed(self.subdomains.items())]
+        while stack:
+            code, depth, node = stack.pop()
+            nodes.append(node)
+            depths.append(depth)
+            nodes_by_code[code] = node
+            if node.content is not None:
+                domains.append(node.content)
+            stack.extend((code + (part,), depth + 1, child) for part, child in reversed(node.subdomains.items()))
+
+        self._flat_views = _FlatViews(nodes, depths, max(depths, default=0), domains, nodes_by_code)
 
     def __repr__(self) -> str:
+        if self.content is None:
+            return f"{self.__class__.__name__}(None)"
+
         parts = []
         parent_ref = self
         while parent_ref is not None and  parent_ref.content is not None:
-            parts.insert(0, parent_ref.content.title)
+            parts.append(parent_ref.content.title)
             parent_ref = parent_ref.parent
+        parts.reverse()
         path = "  /  ".join(str(part) for part in parts)
-        return f"{self.__class__.__name__}({path if self.content else None})"
+        return f"{self.__class__.__name__}({path})"
     
-    def __iter__(self):
-        for node in self.traverse(max_depth=10):
-            if node.content is not None:
-                yield node.content
-        return map(
-            lambda domain_node: domain_node.content, 
-            (node for node in self.traverse(max_depth=10) if node.content is not None)
-        )
+    def __iter__(self) -> Iterator[Domain]:
+        if self._flat_views is not None:
+            return iter(self._flat_views.domains)
+        return (node.content for node in self.traverse(max_depth=10) if node.content is not None)
     
-    def iterate_domains(self):
+    def iterate_domains(self) -> Iterator["DomainNode"]:
         return self.traverse(max_depth=10)  # 10 is greater than maximum depth
     
-    def traverse(self, max_depth: int = 5) -> Generator["DomainNode", None, None]:
-        for node in self.subdomains.values(): 
+    def traverse(self, max_depth: int = 5) -> Iterator["DomainNode"]:
+        flat_views = self._flat_views
+        if flat_views is not None:
+            depth_limit = max(max_depth, 0) + 1  # direct children are always included
+            if depth_limit >= flat_views.max_depth:
+                return iter(flat_views.nodes)
+            return (node for node, depth in zip(flat_views.nodes, flat_views.depths) if depth <= depth_limit)
+        return self._traverse_tree(max_depth=max_depth)
+
+    def _traverse_tree(self, max_depth: int) -> Generator["DomainNode", None, None]:
+        # explicit stack of child iterators with the remaining depth below them, instead of nested generators
+        stack = [(iter(self.subdomains.values()), max_depth)]
+        while stack:
+            children, remaining_depth = stack[-1]
+            node = next(children, None)
+            if node is None:
+                stack.pop()
+                continue
             yield node
-            if max_depth > 0:
-                yield from node.traverse(max_depth=max_depth - 1)
+            if remaining_depth > 0 and node.subdomains:
+                stack.append((iter(node.subdomains.values()), remaining_depth - 1))
 
     def get_content_property(self, prop: str) -> str:
         if self.content is not None:
@@ -89,19 +159,18 @@ class DomainNode:
         """
         Get Domain using domain code.
         """
-        if isinstance(key, str):
-            key = self.domain_code(key)
-        else:
-            key = copy(key)
-        
-        if len(key) == 0:
-            content = self.content
-            assert content is not None
-            return content
+        code = _parse_code(key) if isinstance(key, str) else tuple(key)
+
+        if self._flat_views is not None:
+            node = self._flat_views.nodes_by_code[code]
         else:
-            descend = key.pop(0)
-            content = self.subdomains[descend][key]
-            return content
+            node = self
+            for part in code:
+                node = node.subdomains[part]
+
+        content = node.content
+        assert content is not None
+        return content
         
 
 def assemble_hierarchy(domains: List[DomainType]) -> DomainNode:
@@ -110,12 +179,13 @@ def assemble_hierarchy(domains: List[DomainType]) -> DomainNode:
     for domain in domains:
         root.insert(domain)
 
+    root.finalize()
     return root
 
 
 def read_domains_from_json(json_path: Union[str, Path], alternative_domain_class: Optional[Type[DomainType]] = None) -> List[DomainType]:
-    with open(json_path, "r") as f:
-        data = json.load(f)
+    raw_data = Path(json_path).read_bytes()
+    data = orjson.loads(raw_data) if orjson is not None else json.loads(raw_data)
 
     if alternative_domain_class is None:
         domain_class = Domain
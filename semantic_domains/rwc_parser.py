@@ -1,12 +1,21 @@
 import json
+import re
+import sys
 from pathlib import Path
-from typing import Dict, List, Tuple, TypeVar, Union
+from typing import Dict, List, Optional, Tuple, TypeVar, Union
 from importlib.metadata import version
 
 from docx import Document
+from docx.enum.style import WD_STYLE_TYPE
+from docx.oxml.ns import qn
 
 from semantic_domains.definitions import Domain, Question
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 
 DomainType = TypeVar("DomainType", bound=Domain)
 
@@ -16,6 +25,53 @@ def read_docx(path: Union[str, Path]):
     return document
 
 
+def read_docx_lines(document) -> List[Tuple[str, str]]:
+    """
+    Extracts style names and text of all non-empty top-level paragraphs of the document. The XML is read directly
+    instead of going through `document.paragraphs`, because python-docx creates a new `Paragraph` wrapper and
+    resolves its style every time a paragraph is accessed.
+
+    Returns:
+        List[Tuple[str, str]]: The list of `(style_name, text)` pairs. Style names are interned.
+    """
+    style_names = {}
+    for style in document.styles:
+        style_name = style.name if style.name is not None else style.style_id  # `w:name` is optional
+        if style_name is not None:
+            style_names[style.style_id] = sys.intern(style_name)
+    default_style = document.styles.default(WD_STYLE_TYPE.PARAGRAPH)
+    default_style_name = "Normal"
+    if default_style is not None:
+        default_style_name = style_names.get(default_style.style_id, default_style_name)
+    default_style_name = sys.intern(default_style_name)
+
+    p_style_tag = qn("w:pStyle")
+    val_attr = qn("w:val")
+    run_tag, hyperlink_tag = qn("w:r"), qn("w:hyperlink")
+    # same run content as `Paragraph.text`, python-docx oxml elements convert themselves to text with `str`
+    run_content_tags = [qn(tag) for tag in ("w:br", "w:cr", "w:noBreakHyphen", "w:ptab", "w:t", "w:tab")]
+
+    lines = []
+    for paragraph in document.element.body.iterchildren(qn("w:p")):
+        text_parts = []
+        for child in paragraph.iterchildren(run_tag, hyperlink_tag):
+            runs = (child,) if child.tag == run_tag else child.iterchildren(run_tag)
+            for run in runs:
+                text_parts.extend(str(element) for element in run.iterchildren(*run_content_tags))
+        text = "".join(text_parts)
+        if text.strip() == "":  # skip empty lines
+            # normally there are no empty lines, but this could still happen
+            continue
+
+        style_name = default_style_name
+        p_style = paragraph.find(f"{qn('w:pPr')}/{p_style_tag}")
+        if p_style is not None:
+            style_name = style_names.get(p_style.get(val_attr), default_style_name)
+
+        lines.append((style_name, text))
+    return lines
+
+
 def reverse_dict(dict_: Dict) -> Dict:
     keys, vals = zip(*dict_.items())
     reversed = dict(zip(vals, keys))
@@ -31,6 +87,23 @@ class RWCParser:
     domain_description_style_name = "descr"
     question_style_name = "quest1"
     word_style_name = "words"
+    # characters used for splitting the list of words are replaced while inside brackets
+    char_protection_replacement = {
+        " ": "_",
+        ",": "#"
+    }
+    # the same replacement as a translation table for bytes of utf-8 encoded lines
+    char_protection_table = bytes.maketrans(
+        "".join(char_protection_replacement.keys()).encode("utf-8"),
+        "".join(char_protection_replacement.values()).encode("utf-8")
+    )
+    # part of speech markers are expanded and protected characters are recovered in a single pass over a word
+    word_replacements = {
+        "(v)": "(verb)",
+        "(n)": "(noun)",
+        **reverse_dict(char_protection_replacement)
+    }
+    word_replacement_pattern = re.compile("|".join(re.escape(pattern) for pattern in word_replacements))
     
     def __init__(self, document_path: Union[str, Path]):
         """
@@ -38,6 +111,7 @@ class RWCParser:
             document_path (Union[str, Path]): The path to the document to parse.
         """
         self.document = read_docx(document_path)
+        self._lines = read_docx_lines(self.document)
         self.cursor = 0
 
     def num_lines(self) -> int:
@@ -45,38 +119,41 @@ class RWCParser:
         Returns:
             int: The number of lines in the document.
         """
-        return len(self.document.paragraphs)
+        return len(self._lines)
     
-    def get_current_line(self, print_progress_every_n_lines:int = 1):
+    def get_current_line(self, print_progress_every_n_lines:int = 1024) -> Tuple[str, str]:
         num_lines = self.num_lines()
         if self.cursor < num_lines:
-            if self.cursor % print_progress_every_n_lines == 0:
-                print(f"Parsing progress {self.cursor}/{num_lines}\r", end="")
-            line = self.document.paragraphs[self.cursor]
-            while line.text.strip() == "":  # skip empty lines
-                # normally there are no empty lines, but this could still happen
-                self.advance()
-                line = self.document.paragraphs[self.cursor]
-            return line
+            self.print_progress(self.cursor, num_lines, print_progress_every_n_lines)
+            return self._lines[self.cursor]
         else:
             raise StopIteration()
     
+    @staticmethod
+    def print_progress(line_ind: int, num_lines: int, print_progress_every_n_lines: int) -> None:
+        if line_ind % print_progress_every_n_lines == 0:
+            print(f"Parsing progress {line_ind}/{num_lines}\r", end="")
+
     def advance(self) -> None:
         self.cursor += 1
 
-    def verify_style(self, line, style_name) -> None:
-        assert line.style.name == style_name, f"Domain title style is expected to be `{style_name}`, but the current line has style `{line.style.name}`"
+    def verify_style(self, line_style, style_name) -> None:
+        assert line_style == style_name, f"Domain title style is expected to be `{style_name}`, but the current line has style `{line_style}`"
     
     def parse_domain_title(self) -> Tuple[str, str]:
         """
         Domain title in the document has `Heading 2` style, so here it is checked that the current line contains text in this style.
         """
-        line = self.get_current_line()
-        self.verify_style(line, self.domain_header_style_name)
-        domain_code, *domain_title_parts = line.text.split(" ")
-        domain_title = " ".join(domain_title_parts)  # reassemble the domain title
+        line_style, line_text = self.get_current_line()
+        self.verify_style(line_style, self.domain_header_style_name)
+        domain_code, domain_title = self.split_domain_title(line_text)
         self.advance()
         return domain_code, domain_title
+
+    def split_domain_title(self, line_text: str) -> Tuple[str, str]:
+        domain_code, *domain_title_parts = line_text.split(" ")
+        domain_title = " ".join(domain_title_parts)  # reassemble the domain title
+        return domain_code, domain_title
     
     def parse_domain_description(self) -> str:
         """
@@ -85,21 +162,24 @@ class RWCParser:
         Returns:
             str: The domain description.
         """
-        line = self.get_current_line()
-        self.verify_style(line, self.domain_description_style_name)
-        domain_description = line.text
+        line_style, line_text = self.get_current_line()
+        self.verify_style(line_style, self.domain_description_style_name)
+        domain_description = line_text
         self.advance()
         return domain_description
     
     def parse_question_text(self) -> Tuple[int, str]:
-        line = self.get_current_line()
-        self.verify_style(line, self.question_style_name)
-        question_text = line.text
-        question_num, *question_parts = question_text.split(" ")
+        line_style, line_text = self.get_current_line()
+        self.verify_style(line_style, self.question_style_name)
+        question_num, question_text = self.split_question_text(line_text)
+        self.advance()
+        return question_num, question_text
+
+    def split_question_text(self, line_text: str) -> Tuple[int, str]:
+        question_num, *question_parts = line_text.split(" ")
         assert question_num.startswith("(") and question_num.endswith(")")
         question_num = question_num.lstrip("(").rstrip(")")
         question_text = " ".join(question_parts).strip()
-        self.advance()
         return int(question_num), question_text
     
     def parse_set_of_words(self) -> List[str]:
@@ -114,124 +194,142 @@ class RWCParser:
         Returns:
             List[str]: The list of words.
         """
-        line = self.get_current_line()
-        self.verify_style(line, self.word_style_name)
-        words_text = line.text
+        line_style, line_text = self.get_current_line()
+        self.verify_style(line_style, self.word_style_name)
+        final_words = self.tokenize_word_line(line_text)
+        self.advance()
+        return final_words
+
+    def tokenize_word_line(self, line_text: str) -> List[str]:
+        words_text = line_text
         assert words_text.startswith("•")  # line that contains words starts with `•`
         words_text = words_text.lstrip("•").strip()
 
         # need to properly tokenize words (they are separated by commas), make sure to keep the content inside the brackets intact
-        char_protection_replacement = {
-            " ": "_",
-            ",": "#"
-        }
-
-        def protect_brackets(string, replacement_map):
-            """
-            Protect characters used for splitting a string by replacing them with something else.
-            """
-            stack = []
-            modified_string = list(string)
-            
-            opening = {"("}
-            correspondence = {")": "("}  # this is the only type of brackets in the document
-            for char_ind in range(len(string)):
-                char = string[char_ind]
-                if char in opening:
-                    stack.append(char)
-                elif char in correspondence:
-                    pair = stack.pop(-1)
-                    assert pair == correspondence[char]
-                else:
-                    if len(stack) > 0 and char in replacement_map:
-                        modified_string[char_ind] = replacement_map[char]
-            return "".join(modified_string)
-        
-        def recover_replaced_characters(word, replacement_map):
-            for k, v in replacement_map.items():
-                word = word.replace(v, k)
-            return word
-        
-        def remove_double_spaces(word: str):
-            while "  " in word:
-                word = word.replace("  ", " ")
-            return word
-        
-        def tokenize_words(words_text, replacement_map):
-            words_text = protect_brackets(words_text, replacement_map)
-            words = words_text.split(",")  # TODO some words are slit using other punctuation characters
-            words = [word.strip() for word in words]
-            words = [word for word in words if word!= ""]  # remove empty words
-            words = [word.replace("(v)", "(verb)") for word in words]  # replace (v) with (verb)
-            words = [word.replace("(n)", "(noun)") for word in words]  # replace (n) with (noun)
-            words = [recover_replaced_characters(word, replacement_map) for word in words]        
-            words = [remove_double_spaces(word) for word in words]  # remove double spaces
-            return words
-
-        final_words = tokenize_words(words_text=words_text, replacement_map=char_protection_replacement)
-        
-        self.advance()
-        return final_words
-    
-    def parse_question(self):
+        words_text = self.protect_brackets(words_text, self.char_protection_table)
+        words = words_text.split(",")  # TODO some words are slit using other punctuation characters
+        words = [word.strip() for word in words]
+        words = [word for word in words if word!= ""]  # remove empty words
+        replace_word_marker = self.replace_word_marker
+        words = [self.word_replacement_pattern.sub(replace_word_marker, word) for word in words]  # replace (v) with (verb), (n) with (noun)
+        words = [self.remove_double_spaces(word) for word in words]  # remove double spaces
+        return words
+
+    @staticmethod
+    def protect_brackets(string: str, protection_table: bytes) -> str:
         """
-        Parses the current question. Question is represented by the question number and the 
-        question text.
-
-        Returns:
-            Tuple[int, str]: The question number and the question text.
+        Protect characters used for splitting a string by replacing them with something else while inside brackets.
+        Works on utf-8 bytes, ascii characters never appear inside multibyte sequences.
         """
-        question_num, question_text = self.parse_question_text()
-        question_words = self.parse_set_of_words()
-        return Question(question_num, question_text, question_words)
+        opening, closing = 40, 41  # `(` and `)`, this is the only type of brackets in the document
+        data = string.encode("utf-8")
+        modified_string = bytearray(data)
+        depth = 0
+        for char_ind, char in enumerate(data):
+            if char == opening:
+                depth += 1
+            elif char == closing:
+                depth -= 1
+                assert depth >= 0, "Unbalanced brackets"
+            elif depth:
+                modified_string[char_ind] = protection_table[char]
+        return modified_string.decode("utf-8")
+
+    def replace_word_marker(self, match: re.Match) -> str:
+        """
+        Replaces a part of speech marker or recovers a protected character, used with `word_replacement_pattern`.
+        """
+        return self.word_replacements[match.group(0)]
+
+    @staticmethod
+    def remove_double_spaces(word: str) -> str:
+        while "  " in word:
+            word = word.replace("  ", " ")
+        return word
     
-    def parse_domain_questions(self) -> List[Question]:
+    def parse_domain(self) -> Domain:
         """
-        Parse a block of questions for a domain. The should contain only questions and words with 
-        corresponding text styles. 
+        Parses a domain block starting at the current line. The domain block is expected to have a domain title,
+        a domain description, and a list of questions. If this order is not observed, an error is raised.
 
         Returns:
-            List[Question]: The list of questions.
+            Domain: The parsed domain.
         """
-        questions = []
-
-        line = self.get_current_line()
-        while line.style.name in [self.question_style_name, self.word_style_name]:
-            questions.append(self.parse_question())
-            try:
-                line = self.get_current_line()
-            except StopIteration:
-                break  # end of document
-
-        return questions
+        if self.cursor >= self.num_lines():
+            raise StopIteration()
+        return self.parse_domains(max_domains=1)[0]
 
-    def parse_domain(self):
+    def parse(self, print_progress_every_n_lines: int = 1024) -> List[Domain]:
         """
-        Parses a domain block. The domain block is expected to have a domain title, a domain description, 
-        and a list of questions. If this order is not observed, an error is raised.
+        Parses the document and returns a list of domains.
 
         Returns:
-            Domain: The parsed domain.
+            List[Domain]: The list of domains.
         """
-        domain_code, domain_title = self.parse_domain_title()
-        domain_description = self.parse_domain_description()
-        questions = self.parse_domain_questions()
-
-        return Domain(domain_code, domain_title, domain_description, questions)
+        self.cursor = 0
+        return self.parse_domains(print_progress_every_n_lines=print_progress_every_n_lines)
 
-    def parse(self) -> List[Domain]:
+    def parse_domains(self, max_domains: Optional[int] = None, print_progress_every_n_lines: int = 1024) -> List[Domain]:
         """
-        Parses the document and returns a list of domains.
+        Parses domains starting at the current line. The lines are processed in a single pass, the style of each
+        line determines which part of the domain it contains. Every domain block is expected to have a domain title,
+        a domain description, and a list of questions, each question followed by its words. If this order is not
+        observed, an error is raised.
+
+        Args:
+            max_domains (Optional[int]): Stop after this number of domains, parse until the end of the document if `None`.
 
         Returns:
             List[Domain]: The list of domains.
         """
-        domains = []
+        domains: List[Domain] = []
 
-        self.cursor = 0
-        while self.cursor < self.num_lines():
-            domain = self.parse_domain()
-            domains.append(domain)
+        domain_code, domain_title, domain_description = None, None, None
+        questions: List[Question] = []
+        question_num, question_text = None, None
+
+        # style names of the lines are interned, so they can be compared by identity
+        header_style = sys.intern(self.domain_header_style_name)
+        description_style = sys.intern(self.domain_description_style_name)
+        question_style = sys.intern(self.question_style_name)
+        word_style = sys.intern(self.word_style_name)
+
+        styles_after_header = (description_style,)
+        styles_after_description = (question_style, header_style)
+        styles_after_question = (word_style,)
+        styles_after_words = (question_style, header_style)
+
+        lines = self._lines
+        num_lines = self.num_lines()
+        expected_styles: Tuple[str, ...] = (header_style,)
+        for line_ind in range(self.cursor, num_lines):
+            line_style, line_text = lines[line_ind]
+            self.print_progress(line_ind, num_lines, print_progress_every_n_lines)
+            assert line_style in expected_styles, f"Line style is expected to be one of {expected_styles}, but the current line has style `{line_style}`"
+
+            if line_style is header_style:
+                if domain_code is not None:
+                    domains.append(Domain(domain_code, domain_title, domain_description, questions))
+                    if len(domains) == max_domains:
+                        self.cursor = line_ind
+                        return domains
+                domain_code, domain_title = self.split_domain_title(line_text)
+                questions = []
+                expected_styles = styles_after_header
+            elif line_style is description_style:
+                domain_description = line_text
+                expected_styles = styles_after_description
+            elif line_style is question_style:
+                question_num, question_text = self.split_question_text(line_text)
+                expected_styles = styles_after_question
+            else:  # words
+                questions.append(Question(question_num, question_text, self.tokenize_word_line(line_text)))
+                expected_styles = styles_after_words
+
+        self.cursor = num_lines
+        if domain_code is not None:
+            assert header_style in expected_styles, f"The document ends with an incomplete domain `{domain_code}`"
+            domains.append(Domain(domain_code, domain_title, domain_description, questions))
 
         return domains
 
@@ -242,25 +340,23 @@ def parse_rwc_domains(domains_path: Union[str, Path]) -> List[Domain]:
 
 
 def dump_domains_to_json(domains: List[DomainType], output_json_path: Union[str, Path]) -> None:
-    with open(output_json_path, "w") as f:
-        f.write(json.dumps(
-            {
-                "version": version("semantic_domains"),
-                "domains": [domain.to_dict() for domain in domains]
-            }, 
-            indent=4
-        ))
+    data = {
+        "version": version("semantic_domains"),
+        "domains": [domain.to_dict() for domain in domains]
+    }
+
+    if orjson is not None:
+        with open(output_json_path, "wb") as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    else:
+        with open(output_json_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(data, indent=2, ensure_ascii=False))  # same output as orjson
     
 
 def convert_rwc_domains_to_json(
         domains_path: Union[str, Path], output_json_path: Union[str, Path]
     ) -> None:
     domains = parse_rwc_domains(domains_path)
-
-    dict_domains = []
-    for domain in domains:
-        dict_domains.append(domain.to_dict())
-
-    dump_domains_to_json(domains=dict_domains, output_json_path=output_json_path)
+    dump_domains_to_json(domains=domains, output_json_path=output_json_path)
 
     # TODO need to do a verification by checking the average word length and then checking that all the words do not appear as outliers